@@ -4,18 +4,35 @@ Audiobook Studio Python Backend
 FastAPI server for text-to-speech generation using Chatterbox TTS
 """
 
+import os
+
+# Must be set before torch is imported: expandable segments keep the CUDA
+# caching allocator from fragmenting under variable-length generations, and
+# the GC threshold reclaims unused blocks before hitting cudaMalloc again
+os.environ.setdefault(
+    "PYTORCH_CUDA_ALLOC_CONF",
+    "expandable_segments:True,garbage_collection_threshold:0.8"
+)
+
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
+import asyncio
+import contextlib
 import torch
 import torchaudio
+import soundfile as sf
 import numpy as np
 import io
 import logging
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from typing import Optional
 import uvicorn
-import os
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -43,24 +60,196 @@ app.add_middleware(
 
 # Global variables
 tts_model = None
+tts_queue: Optional[asyncio.Queue] = None
+
+# Micro-batching configuration for the TTS request queue
+TTS_MAX_BATCH = int(os.getenv("TTS_MAX_BATCH", "8"))
+TTS_BATCH_WINDOW = float(os.getenv("TTS_BATCH_WINDOW", "0.05"))
+
+# Cache of prepared voice-conditioning tensors, keyed by
+# (path, mtime, exaggeration). Re-encoding the same reference WAV through the
+# speaker encoder on every request is pure repeat work; a handful of entries
+# bounds the VRAM the cached conditionals can hold.
+VOICE_COND_CACHE_SIZE = 8
+_voice_cond_cache: OrderedDict = OrderedDict()
+
+def apply_voice_conditioning(audio_prompt_path: str, exaggeration: float) -> bool:
+    """Install cached (or freshly prepared) conditioning for a reference WAV.
+
+    Returns True when the conditionals are set on the model, letting
+    generate() skip its own audio_prompt_path processing; False means the
+    caller should pass audio_prompt_path through as before.
+    """
+    if not hasattr(tts_model, 'prepare_conditionals'):
+        return False
+
+    try:
+        key = (audio_prompt_path, os.path.getmtime(audio_prompt_path), round(exaggeration, 2))
+        conds = _voice_cond_cache.get(key)
+        if conds is None:
+            tts_model.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+            _voice_cond_cache[key] = tts_model.conds
+            if len(_voice_cond_cache) > VOICE_COND_CACHE_SIZE:
+                _voice_cond_cache.popitem(last=False)
+        else:
+            _voice_cond_cache.move_to_end(key)
+            tts_model.conds = conds
+        return True
+    except Exception as e:
+        logger.warning(f"🎤 Voice conditioning cache failed, falling back to per-call encoding: {e}")
+        return False
+
+# Admission control for the model: bounds how many generate() calls can be
+# in flight at once so concurrent paths cannot stack KV-cache and activation
+# allocations until the GPU OOMs. Generation runs in worker threads, hence a
+# threading semaphore rather than an asyncio one.
+_gpu_semaphore = threading.Semaphore(int(os.getenv("MAX_GPU_INFLIGHT", "1")))
+
+# Allocator hygiene for variable-length texts: every new sequence length can
+# carve fresh allocator bins, so reserved-but-unused memory creeps upward on
+# long-running processes. CUDA_MEMORY_FRACTION caps this process's share of
+# the GPU (useful when the card is shared; 0 disables the cap), and
+# CUDA_CACHE_CLEAN_EVERY releases unused cached segments back to the driver
+# every N generations - the empty_cache call costs a few milliseconds but can
+# return gigabytes of reserved memory (0 disables).
+CUDA_MEMORY_FRACTION = float(os.getenv("CUDA_MEMORY_FRACTION", "0"))
+CUDA_CACHE_CLEAN_EVERY = int(os.getenv("CUDA_CACHE_CLEAN_EVERY", "32"))
+_generation_count = 0
+
+# Long inputs are split on sentence boundaries before generation: attention
+# cost is quadratic in sequence length, so several short chunks decode much
+# faster than one long passage and the waveforms concatenate cleanly
+TTS_CHUNK_CHAR_LIMIT = int(os.getenv("TTS_CHUNK_CHAR_LIMIT", "400"))
+TTS_CROSSFADE_MS = 20
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+def split_text_for_tts(text: str, max_chars: int = TTS_CHUNK_CHAR_LIMIT) -> list[str]:
+    """Split text into sentence-aligned chunks no longer than max_chars"""
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    current = []
+    current_len = 0
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        if not sentence:
+            continue
+        if current and current_len + len(sentence) > max_chars:
+            chunks.append(' '.join(current))
+            current = []
+            current_len = 0
+        current.append(sentence)
+        current_len += len(sentence) + 1
+    if current:
+        chunks.append(' '.join(current))
+
+    return chunks if chunks else [text]
+
+def concat_with_crossfade(pieces: list, sample_rate: int) -> torch.Tensor:
+    """Concatenate waveform chunks with a short linear crossfade at each join.
+
+    A hard cut between independently generated chunks leaves an audible click;
+    TTS_CROSSFADE_MS of overlap-blend removes it.
+    """
+    if len(pieces) == 1:
+        return pieces[0]
+
+    fade = int(sample_rate * TTS_CROSSFADE_MS / 1000)
+    out = pieces[0]
+    for piece in pieces[1:]:
+        n = min(fade, out.shape[-1], piece.shape[-1])
+        if n > 0:
+            ramp = torch.linspace(0.0, 1.0, n, device=out.device)
+            mixed = out[..., -n:] * (1 - ramp) + piece[..., :n] * ramp
+            out = torch.cat([out[..., :-n], mixed, piece[..., n:]], dim=-1)
+        else:
+            out = torch.cat([out, piece], dim=-1)
+    return out
+
+# Opt-in placeholder tone when no TTS model is available (frontend development
+# without the ~2GB Chatterbox download); default stays a 503
+PLACEHOLDER_AUDIO = os.getenv("PLACEHOLDER_AUDIO", "0") == "1"
+PLACEHOLDER_SAMPLE_RATE = 24000
 
 # Create output directory for generated audio
 OUTPUT_DIR = Path("generated_audio")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# In-memory index of generated files so /files doesn't stat() every WAV on
+# every request. The directory mtime is the staleness check: it changes
+# whenever a file is added or removed, so external edits are still picked up.
+_files_index: dict[str, dict] = {}
+_files_dir_mtime: float = -1.0
+
+def refresh_files_index() -> list[dict]:
+    """Return the /files listing, rescanning the directory only when it changed"""
+    global _files_index, _files_dir_mtime
+
+    if not OUTPUT_DIR.exists():
+        return []
+
+    dir_mtime = OUTPUT_DIR.stat().st_mtime
+    if dir_mtime != _files_dir_mtime:
+        # Build into a local dict and swap with one assignment: this runs in
+        # a worker thread per request, so mutating the shared index in place
+        # would let a concurrent /files see a cleared or half-built listing
+        index: dict[str, dict] = {}
+        # scandir surfaces the stat result alongside the entry, one syscall
+        # fewer per file than glob + stat
+        with os.scandir(OUTPUT_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.wav'):
+                    stat = entry.stat()
+                    index[entry.name] = {
+                        "filename": entry.name,
+                        "size_kb": round(stat.st_size / 1024, 1),
+                        "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+                    }
+        _files_index = index
+        _files_dir_mtime = dir_mtime
+
+    return list(_files_index.values())
+
 # Create voice samples directory
 VOICE_SAMPLES_DIR = Path("voice_samples")
 VOICE_SAMPLES_DIR.mkdir(exist_ok=True)
 
+# Registry of voice samples keyed by voice id (file stem), so the per-request
+# voice lookup is a dict access instead of a directory scan
+VOICE_SUFFIXES = ('.wav', '.mp3', '.ogg', '.flac')
+_VOICES: dict[str, Path] = {}
+
+def refresh_voice_registry() -> None:
+    """Rebuild the voice-id -> path registry from the samples directory"""
+    _VOICES.clear()
+    for voice_file in VOICE_SAMPLES_DIR.iterdir():
+        if voice_file.is_file() and voice_file.suffix.lower() in VOICE_SUFFIXES:
+            _VOICES[voice_file.stem] = voice_file
+
+def resolve_voice_path(voice_setting: str) -> Optional[Path]:
+    """Look up a voice sample by id, rescanning once on a miss.
+
+    The rescan keeps samples dropped into the directory by hand usable
+    without a restart, while repeat lookups stay in memory. A hit whose
+    file has since been deleted counts as a miss too, so a removed sample
+    falls back to the default voice instead of failing generation.
+    """
+    voice_path = _VOICES.get(voice_setting)
+    if voice_path is None or not voice_path.exists():
+        refresh_voice_registry()
+        voice_path = _VOICES.get(voice_setting)
+    return voice_path
+
+# Characters dropped from filename snippets; one compiled pattern beats a
+# per-character Python loop for a sanitizer that runs on every generation
+_SAFE_FN_RE = re.compile(r'[^\w \-]+')
+
 def generate_filename(text: str) -> str:
     """Generate a unique filename based on timestamp and text snippet"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     # Create a safe filename from first 30 chars of text
-    text_snippet = "".join(c for c in text[:30] if c.isalnum() or c in (' ', '-', '_')).strip()
-    text_snippet = text_snippet.replace(' ', '_')
-    if not text_snippet:
-        text_snippet = "audiobook"
-    return f"{timestamp}_{text_snippet}.wav"
+    text_snippet = _SAFE_FN_RE.sub('', text[:30]).strip().replace(' ', '_') or "audiobook"
+    return f"{datetime.now():%Y%m%d_%H%M%S}_{text_snippet}.wav"
 
 # Device selection with proper GPU support
 if torch.cuda.is_available():
@@ -73,10 +262,40 @@ else:
     device = torch.device("cpu")
     print("⚠️  Using CPU")
 
+# This process only ever does inference: keep autograd off globally, and pin
+# cuDNN to its heuristics instead of benchmark mode - with per-request text
+# lengths every new shape would trigger a re-tune and grow the algo cache
+torch.set_grad_enabled(False)
+torch.backends.cudnn.benchmark = False
+
+# Allow TF32 on Ampere+ tensor cores - near-free matmul throughput at a
+# precision cost that is inaudible for TTS
+if torch.cuda.is_available():
+    torch.set_float32_matmul_precision('high')
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+# Mixed precision for generation: BF16 on Ampere+ (wider exponent range than
+# FP16, no overflow-recovery paths), FP16 on older CUDA GPUs, full FP32 on CPU
+if device.type == "cuda":
+    autocast_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+else:
+    autocast_dtype = None
+
+def autocast_context():
+    """Autocast context for TTS generation - mixed precision on CUDA, no-op elsewhere"""
+    if autocast_dtype is not None:
+        return torch.autocast(device_type=device.type, dtype=autocast_dtype)
+    return contextlib.nullcontext()
+
 class TextRequest(BaseModel):
     text: str
     settings: dict = {}
 
+class BatchTextRequest(BaseModel):
+    texts: list[str]
+    settings: dict = {}
+
 class TTSSettings(BaseModel):
     voice: str = "default"
     exaggeration: float = 0.5
@@ -91,6 +310,7 @@ async def startup_event():
     # Ensure output directories exist
     OUTPUT_DIR.mkdir(exist_ok=True)
     VOICE_SAMPLES_DIR.mkdir(exist_ok=True)
+    refresh_voice_registry()
     logger.info(f"📁 Audio output directory: {OUTPUT_DIR.absolute()}")
     logger.info(f"🎤 Voice samples directory: {VOICE_SAMPLES_DIR.absolute()}")
     
@@ -106,6 +326,12 @@ async def startup_event():
         # Correct Chatterbox API usage
         tts_model = ChatterboxTTS.from_pretrained(device=str(device))
         
+        # Bound this process's share of a shared GPU before any big buffers
+        # are reserved
+        if device.type == "cuda" and CUDA_MEMORY_FRACTION > 0:
+            torch.cuda.set_per_process_memory_fraction(CUDA_MEMORY_FRACTION)
+            logger.info(f"🧮 CUDA memory capped at {CUDA_MEMORY_FRACTION:.0%} of the device")
+
         # Log which device the model is actually running on
         if hasattr(tts_model, 'device'):
             actual_device = tts_model.device
@@ -113,6 +339,53 @@ async def startup_event():
         else:
             logger.info(f"📍 Chatterbox TTS initialized for device: {device}")
         
+        # Optionally compile the model so decoder steps don't run eager PyTorch
+        # with full Python dispatch overhead per op
+        if os.getenv("TORCH_COMPILE", "0") == "1":
+            try:
+                logger.info("⚙️  Compiling TTS model with torch.compile (mode=reduce-overhead)...")
+                # dynamic=True: generate is autoregressive over arbitrary text
+                # lengths, so mark shapes dynamic up front instead of paying a
+                # recompile for every new sequence length
+                tts_model = torch.compile(tts_model, mode="reduce-overhead", fullgraph=False, dynamic=True)
+                logger.info("✅ torch.compile enabled - first generation will be slower while the graph is traced")
+            except Exception as e:
+                logger.warning(f"⚠️  torch.compile failed, continuing with eager model: {e}")
+
+        # Warm up the model so the first user request doesn't pay for cuDNN
+        # autotune, allocator pool growth and (if enabled) torch.compile tracing
+        if os.getenv("TTS_WARMUP", "1") == "1":
+            try:
+                logger.info("🔥 Warming up TTS model...")
+                warmup_start = time.time()
+                with torch.inference_mode(), autocast_context():
+                    # Two passes: the first pays cuDNN autotune / compile
+                    # tracing, the second confirms the allocator pools and
+                    # picked algorithms are actually being reused
+                    for _ in range(2):
+                        tts_model.generate("Warm up.", exaggeration=0.5, cfg_weight=0.5)
+                    # Warm the prompt-conditioned path too if a voice sample
+                    # is present, so cloned-voice requests skip the cold start.
+                    # generate(audio_prompt_path=...) overwrites the model's
+                    # built-in default-voice conditionals, so snapshot and
+                    # restore them - otherwise every default-voice request
+                    # after boot would speak in the sample voice
+                    default_conds = getattr(tts_model, 'conds', None)
+                    for sample in ("female_sample.wav", "male_sample.wav"):
+                        sample_path = VOICE_SAMPLES_DIR / sample
+                        if sample_path.exists():
+                            tts_model.generate("Warm up.", audio_prompt_path=str(sample_path),
+                                               exaggeration=0.5, cfg_weight=0.5)
+                            break
+                    if default_conds is not None:
+                        tts_model.conds = default_conds
+                if device.type == "cuda":
+                    torch.cuda.synchronize()
+                    torch.cuda.empty_cache()
+                logger.info(f"🔥 Warmup complete in {time.time() - warmup_start:.2f}s")
+            except Exception as e:
+                logger.warning(f"⚠️  Warmup generation failed: {e}")
+
         # The model will be downloaded automatically on first use if not present
         logger.info("✅ Chatterbox TTS initialized successfully!")
         logger.info("💡 Model will download automatically on first use if needed (~2GB)")
@@ -126,6 +399,12 @@ async def startup_event():
         logger.error(f"❌ Failed to initialize Chatterbox TTS: {e}")
         tts_model = None
 
+    # Start the micro-batching worker that drains /generate-audio requests
+    global tts_queue
+    tts_queue = asyncio.Queue()
+    asyncio.create_task(tts_batch_loop())
+    logger.info(f"🔀 TTS batch worker started (max_batch={TTS_MAX_BATCH}, window={TTS_BATCH_WINDOW}s)")
+
 @app.get("/")
 async def root():
     return {"message": "Audiobook Studio API", "status": "running"}
@@ -134,20 +413,13 @@ async def root():
 async def list_generated_files():
     """List all generated audio files"""
     try:
-        files = []
-        if OUTPUT_DIR.exists():
-            for file_path in OUTPUT_DIR.glob("*.wav"):
-                stat = file_path.stat()
-                files.append({
-                    "filename": file_path.name,
-                    "size_kb": round(stat.st_size / 1024, 1),
-                    "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
-        
+        # The rescan (when the directory changed) hits the disk - keep it off
+        # the event loop so other requests keep being served meanwhile
+        files = await asyncio.to_thread(refresh_files_index)
+
         # Sort by creation time, newest first
         files.sort(key=lambda x: x["created"], reverse=True)
-        
+
         return {
             "total_files": len(files),
             "output_directory": str(OUTPUT_DIR.absolute()),
@@ -224,17 +496,13 @@ async def download_file(filename: str):
         
         if not file_path.exists() or not file_path.suffix == '.wav':
             raise HTTPException(status_code=404, detail="File not found")
-        
-        # Read file and return as response
-        with open(file_path, 'rb') as f:
-            audio_bytes = f.read()
-        
-        return Response(
-            content=audio_bytes,
+
+        # FileResponse streams straight from disk (sendfile) instead of
+        # reading the whole WAV into memory on the event loop
+        return FileResponse(
+            path=file_path,
             media_type="audio/wav",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+            filename=filename
         )
     except Exception as e:
         logger.error(f"Error downloading file {filename}: {e}")
@@ -275,13 +543,15 @@ async def generate_audio(request: TextRequest):
             raise HTTPException(status_code=400, detail="Text is required")
         
         # Generate audio directly - no preprocessing needed with Chatterbox!
-        audio_bytes, filename, file_info = await generate_tts_audio(text, settings)
-        
-        return Response(
-            content=audio_bytes,
+        filename, file_info = await generate_tts_audio(text, settings)
+
+        # Serve the archived WAV straight from disk; FileResponse streams it
+        # without keeping a second copy of the audio in the Python heap
+        return FileResponse(
+            path=file_info["path"],
             media_type="audio/wav",
+            filename=filename,
             headers={
-                "Content-Disposition": f"attachment; filename={filename}",
                 "X-Generated-File": file_info["path"],
                 "X-File-Size": str(file_info["size"])
             }
@@ -291,14 +561,142 @@ async def generate_audio(request: TextRequest):
         logger.error(f"Audio generation error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate audio: {str(e)}")
 
-async def generate_tts_audio(text: str, settings: dict) -> tuple[bytes, str, dict]:
-    """Generate audio using Chatterbox TTS - returns audio_bytes, filename, and file_info"""
-    global tts_model
-    
+def audio_to_cpu(audio_tensor: torch.Tensor) -> torch.Tensor:
+    """Move the generated waveform to host memory with a single D2H copy.
+
+    On CUDA the copy is staged through pinned memory, so the PCIe transfer
+    runs at full bandwidth instead of the pageable-memory rate.
+    """
+    if audio_tensor.device.type != "cuda":
+        return audio_tensor.cpu()
+
+    pinned = torch.empty_like(audio_tensor, device="cpu", pin_memory=True)
+    pinned.copy_(audio_tensor, non_blocking=True)
+    torch.cuda.synchronize()
+    return pinned
+
+def generate_placeholder_audio(text: str) -> tuple[str, dict]:
+    """Generate a placeholder tone so the app stays usable without a TTS model"""
+    duration = min(max(len(text) * 0.06, 1.0), 30.0)
+    sample_rate = PLACEHOLDER_SAMPLE_RATE
+    n = int(sample_rate * duration)
+    t = np.arange(n, dtype=np.float32) * np.float32(1.0 / sample_rate)
+    # crc32 instead of hash(): stable across processes (hash() is salted per
+    # run, which would break any downstream caching) and cheaper on long text
+    frequency = 440 + (zlib.crc32(text.encode("utf-8", "ignore")) % 200)
+
+    # One fused float32 expression: carrier tone, slow AM wobble, decay envelope
+    audio = (0.3 * np.sin(2 * np.pi * frequency * t)
+             * (1.0 + 0.3 * np.sin(4 * np.pi * t))
+             * np.exp(-t / (duration * 0.8))).astype(np.float32, copy=False)
+
+    filename = generate_filename(text)
+    output_path = OUTPUT_DIR / filename
+    torchaudio.save(str(output_path), torch.from_numpy(audio).unsqueeze(0), sample_rate)
+
+    logger.info(f"🎛️  Placeholder audio generated ({duration:.1f}s @ {frequency} Hz): {output_path}")
+
+    return filename, {"path": str(output_path), "size": output_path.stat().st_size}
+
+@app.post("/generate-audio-batch")
+async def generate_audio_batch(request: BatchTextRequest):
+    """Generate audio for several texts in one call.
+
+    All texts are submitted to the batch queue together, so the worker drains
+    them as one batch instead of paying the scheduling window per text. The
+    WAVs land in the output directory and are fetched via /files/{filename}.
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="At least one text is required")
+
+    results = await asyncio.gather(
+        *(generate_tts_audio(text, request.settings) for text in request.texts),
+        return_exceptions=True
+    )
+
+    items = []
+    for text, result in zip(request.texts, results):
+        if isinstance(result, Exception):
+            logger.error(f"Batch item failed: {result}")
+            items.append({"text": text[:50], "error": str(result)})
+        else:
+            filename, file_info = result
+            items.append({
+                "text": text[:50],
+                "filename": filename,
+                "path": file_info["path"],
+                "size": file_info["size"]
+            })
+
+    return {"total": len(items), "results": items}
+
+async def generate_tts_audio(text: str, settings: dict) -> tuple[str, dict]:
+    """Queue a generation request and wait for the batch worker to process it"""
     if tts_model is None:
+        if PLACEHOLDER_AUDIO:
+            # Tone synthesis + WAV encode are still blocking C calls
+            return await asyncio.to_thread(generate_placeholder_audio, text)
         raise HTTPException(status_code=503, detail="Chatterbox TTS model not available. Please ensure it's properly installed.")
-    
-    import time
+
+    if tts_queue is None:
+        # Batch worker not running (e.g. startup still in progress) - still
+        # keep the multi-second generate off the event-loop thread
+        return await asyncio.to_thread(generate_tts_sync, text, settings)
+
+    future = asyncio.get_running_loop().create_future()
+    await tts_queue.put((text, settings, future))
+    return await future
+
+async def tts_batch_loop():
+    """Drain concurrent generation requests into batches and run them off the event loop.
+
+    Chatterbox's generate() API takes a single text, so a drained batch is run
+    back-to-back in one worker-thread hop - this keeps the GPU continuously fed
+    under concurrent load instead of paying a thread dispatch per request.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        jobs = [await tts_queue.get()]
+        deadline = loop.time() + TTS_BATCH_WINDOW
+        while len(jobs) < TTS_MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(tts_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        if len(jobs) > 1:
+            logger.info(f"🔀 Processing batch of {len(jobs)} TTS requests")
+
+        results = await asyncio.to_thread(generate_tts_batch, [(text, settings) for text, settings, _ in jobs])
+
+        for (_, _, future), result in zip(jobs, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+def generate_tts_batch(batch: list) -> list:
+    """Run a drained batch of (text, settings) jobs, returning results or exceptions per job"""
+    results = []
+    for text, settings in batch:
+        try:
+            results.append(generate_tts_sync(text, settings))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def generate_tts_sync(text: str, settings: dict) -> tuple[str, dict]:
+    """Generate audio using Chatterbox TTS - returns filename and file_info"""
+    global tts_model, _generation_count
+
+    if tts_model is None:
+        raise HTTPException(status_code=503, detail="Chatterbox TTS model not available. Please ensure it's properly installed.")
+
     start_time = time.time()
     logger.info(f"🎵 Generating audio with Chatterbox TTS...")
     logger.info(f"📊 Text length: {len(text)} characters")
@@ -317,54 +715,41 @@ async def generate_tts_audio(text: str, settings: dict) -> tuple[bytes, str, dic
         # Chatterbox TTS correct API - returns tensor directly
         # Parameters based on documentation: text, audio_prompt_path (optional), exaggeration, cfg_weight
         
-        # Handle voice selection
+        # Handle voice selection via the in-memory registry - no per-request
+        # directory scan
         voice_setting = settings.get('voice', 'default')
         audio_prompt_path = None
-        
-        if voice_setting == 'female_sample':
-            # Use female voice sample if available
-            female_sample_path = VOICE_SAMPLES_DIR / "female_sample.wav"
-            if female_sample_path.exists():
-                audio_prompt_path = str(female_sample_path)
-                logger.info(f"🎤 Using female voice sample: {audio_prompt_path}")
-            else:
-                logger.warning(f"🎤 Female voice sample not found at {female_sample_path}")
-        elif voice_setting == 'male_sample':
-            # Use male voice sample if available
-            male_sample_path = VOICE_SAMPLES_DIR / "male_sample.wav"
-            if male_sample_path.exists():
-                audio_prompt_path = str(male_sample_path)
-                logger.info(f"🎤 Using male voice sample: {audio_prompt_path}")
-            else:
-                logger.warning(f"🎤 Male voice sample not found at {male_sample_path}")
-        elif voice_setting.startswith('custom_'):
-            # Handle uploaded custom voices
-            # Look for the custom voice file (could be .wav, .mp3, etc.)
-            custom_files = list(VOICE_SAMPLES_DIR.glob(f"{voice_setting}.*"))
-            if custom_files:
-                audio_prompt_path = str(custom_files[0])  # Use the first matching file
-                logger.info(f"🎤 Using custom voice sample: {audio_prompt_path}")
-            else:
-                logger.warning(f"🎤 Custom voice '{voice_setting}' not found in {VOICE_SAMPLES_DIR}")
-        elif voice_setting == 'default':
+
+        if voice_setting == 'default':
             logger.info("🎤 Using default Chatterbox voice")
         else:
-            logger.warning(f"🎤 Unknown voice setting '{voice_setting}', using default")
-        
-        # Generate with appropriate voice
-        if audio_prompt_path:
-            audio_tensor = tts_model.generate(
-                text,
-                audio_prompt_path=audio_prompt_path,
-                exaggeration=settings.get('exaggeration', 0.5),
-                cfg_weight=settings.get('cfg_weight', 0.5)
-            )
-        else:
-            audio_tensor = tts_model.generate(
-                text,
-                exaggeration=settings.get('exaggeration', 0.5),
-                cfg_weight=settings.get('cfg_weight', 0.5)
-            )
+            voice_path = resolve_voice_path(voice_setting)
+            if voice_path is not None:
+                audio_prompt_path = str(voice_path)
+                logger.info(f"🎤 Using voice sample: {audio_prompt_path}")
+            else:
+                logger.warning(f"🎤 Voice '{voice_setting}' not found in {VOICE_SAMPLES_DIR}, using default")
+        
+        # Generate with appropriate voice, one sentence-aligned chunk at a time
+        gen_kwargs = {
+            'exaggeration': settings.get('exaggeration', 0.5),
+            'cfg_weight': settings.get('cfg_weight', 0.5)
+        }
+        if audio_prompt_path and not apply_voice_conditioning(audio_prompt_path, gen_kwargs['exaggeration']):
+            gen_kwargs['audio_prompt_path'] = audio_prompt_path
+
+        chunks = split_text_for_tts(text)
+        if len(chunks) > 1:
+            logger.info(f"✂️  Splitting text into {len(chunks)} sentence chunks")
+
+        with _gpu_semaphore, torch.inference_mode(), autocast_context():
+            pieces = [tts_model.generate(chunk, **gen_kwargs) for chunk in chunks]
+            # Drain the stream before releasing the semaphore so the next
+            # admitted request sees the VRAM actually freed, not just queued
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+
+        audio_tensor = concat_with_crossfade(pieces, tts_model.sr)
         
         gen_time = time.time() - gen_start
         logger.info(f"✅ Audio generated in {gen_time:.2f}s")
@@ -380,26 +765,17 @@ async def generate_tts_audio(text: str, settings: dict) -> tuple[bytes, str, dic
         filename = generate_filename(text)
         output_path = OUTPUT_DIR / filename
         
-        # Use torchaudio to save the tensor to both file and bytes
-        import torchaudio
-        import tempfile
-        import os
-        
-        # Save to the permanent output directory
+        # One D2H copy feeding a single in-memory 16-bit PCM encode; the
+        # archived file in generated_audio/ is what FileResponse serves,
+        # so the WAV is serialized exactly once
+        audio_cpu = audio_to_cpu(audio_tensor)
+        wav = audio_cpu.squeeze(0).clamp(-1, 1).numpy()
+        buffer = io.BytesIO()
+        sf.write(buffer, wav, tts_model.sr, format="WAV", subtype="PCM_16")
+        audio_bytes = buffer.getvalue()
+
         logger.info(f"📁 Saving audio to: {output_path}")
-        torchaudio.save(str(output_path), audio_tensor.cpu(), tts_model.sr)
-        
-        # Also create bytes for HTTP response using temp file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            # Save tensor to temporary WAV file
-            torchaudio.save(temp_file.name, audio_tensor.cpu(), tts_model.sr)
-            
-            # Read the WAV file as bytes
-            with open(temp_file.name, 'rb') as f:
-                audio_bytes = f.read()
-            
-            # Clean up temp file
-            os.unlink(temp_file.name)
+        output_path.write_bytes(audio_bytes)
         
         total_time = time.time() - start_time
         
@@ -415,8 +791,16 @@ async def generate_tts_audio(text: str, settings: dict) -> tuple[bytes, str, dic
             "path": str(output_path),
             "size": file_size
         }
-        
-        return audio_bytes, filename, file_info
+
+        # Periodically hand reserved-but-unused allocator segments back to
+        # the driver so variable text lengths don't ratchet up VRAM forever
+        _generation_count += 1
+        if (CUDA_CACHE_CLEAN_EVERY and device.type == "cuda"
+                and _generation_count % CUDA_CACHE_CLEAN_EVERY == 0):
+            torch.cuda.empty_cache()
+            logger.info(f"🧹 Released cached CUDA memory after {_generation_count} generations")
+
+        return filename, file_info
         
     except Exception as e:
         logger.error(f"Chatterbox TTS generation failed: {e}")
@@ -430,10 +814,6 @@ async def upload_voice(voice_file: UploadFile = File(...)):
         if not voice_file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="File must be an audio file")
         
-        # Validate file size (max 10MB)
-        if voice_file.size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 10MB.")
-        
         # Create a unique filename for the uploaded voice
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_extension = os.path.splitext(voice_file.filename)[1] or '.wav'
@@ -446,21 +826,31 @@ async def upload_voice(voice_file: UploadFile = File(...)):
         logger.info(f"📤 Uploading voice sample: {voice_file.filename}")
         logger.info(f"💾 Saving to: {voice_path}")
         
-        # Write the uploaded file
+        # Stream the upload to disk in 1 MB chunks instead of buffering the
+        # whole body in memory; the size limit is enforced on bytes actually
+        # received rather than the client-reported (spoofable) size header
+        size = 0
         with open(voice_path, "wb") as f:
-            content = await voice_file.read()
-            f.write(content)
-        
+            while chunk := await voice_file.read(1 << 20):
+                size += len(chunk)
+                if size > 10 * 1024 * 1024:
+                    voice_path.unlink(missing_ok=True)
+                    raise HTTPException(status_code=413, detail="File too large. Maximum size is 10MB.")
+                f.write(chunk)
+
+        _VOICES[voice_id] = voice_path
         logger.info(f"✅ Voice sample uploaded successfully: {voice_id}")
-        
+
         return {
             "message": "Voice sample uploaded successfully",
             "voice_id": voice_id,
             "filename": filename,
             "path": str(voice_path),
-            "size": len(content)
+            "size": size
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to upload voice sample: {str(e)}")
@@ -468,10 +858,35 @@ async def upload_voice(voice_file: UploadFile = File(...)):
 # Endpoint handlers
 
 if __name__ == "__main__":
+    # Prefer the libuv-based event loop and C HTTP parser when available
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "auto"
+
+    try:
+        import httptools  # noqa: F401
+        http_impl = "httptools"
+    except ImportError:
+        http_impl = "auto"
+
+    # Worker count is env-driven. The TTS model is GPU-resident and not
+    # fork-safe, so more than one worker is only honored for CPU inference;
+    # reload mode (the dev default) always forces a single worker.
+    reload_mode = os.getenv("DEV", "1") == "1"
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1 and device.type != "cpu":
+        print("⚠️  WEB_CONCURRENCY > 1 would load one model copy per worker on GPU; forcing 1 worker")
+        workers = 1
+
     uvicorn.run(
         "backend:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=reload_mode,
+        workers=1 if reload_mode else workers,
+        loop=loop_impl,
+        http=http_impl,
         log_level="info"
     )
@@ -5,9 +5,14 @@ Uses small local models to add emotional annotations
 """
 
 import sys
+import os
 import json
+import hashlib
 import re
 import random
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List, Dict, Tuple
 import argparse
 from pathlib import Path
@@ -17,15 +22,195 @@ try:
     from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
     import torch
     HF_AVAILABLE = True
+    if torch.cuda.is_available():
+        # TF32 matmuls: free throughput on Ampere+ for any fp32 fallback ops
+        torch.set_float32_matmul_precision("high")
+        torch.backends.cuda.matmul.allow_tf32 = True
 except ImportError:
     HF_AVAILABLE = False
     print("Transformers not available, using rule-based fallback")
 
+@functools.lru_cache(maxsize=1)
+def _discover_ollama_model():
+    """Pick the Ollama model to use, once per process.
+
+    ANNOTATION_MODEL in the environment skips discovery entirely; otherwise
+    /api/tags is queried a single time and the answer is reused by every
+    LocalAnnotator constructed afterwards. Returns None when Ollama is
+    unreachable or has no suitable model.
+    """
+    override = os.environ.get("ANNOTATION_MODEL")
+    if override:
+        return override
+
+    try:
+        import requests
+        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        if response.status_code != 200:
+            print("Ollama not available, using rule-based")
+            return None
+
+        models = response.json().get("models", [])
+
+        # Look for small models
+        preferred_models = ["llama3.2:1b", "phi3:3.8b", "gemma2:2b", "qwen2:1.5b"]
+        for model in preferred_models:
+            if any(m["name"].startswith(model) for m in models):
+                return model
+
+        print("No suitable Ollama models found, using rule-based")
+        return None
+
+    except Exception as e:
+        print(f"Ollama discovery failed: {e}")
+        return None
+
+def _intensity_desc(intensity: float) -> str:
+    """Bucket the 0-1 intensity into the wording the prompts use"""
+    return "subtle" if intensity < 0.4 else "moderate" if intensity < 0.7 else "expressive"
+
+def _hf_quantization_config():
+    """Int4 weight-only quantization config when torchao is installed.
+
+    Decode on these model sizes is bound by weight bandwidth, so 4-bit
+    weights roughly quarter the bytes read per token. Returns None when
+    torchao is missing and the loaders fall back to the fp16/fp32 path.
+    """
+    try:
+        from torchao.quantization import Int4WeightOnlyConfig
+        from transformers import TorchAoConfig
+        return TorchAoConfig(quant_type=Int4WeightOnlyConfig())
+    except ImportError:
+        return None
+
+def _hf_dtype():
+    """Pick the inference dtype: bf16 where supported, else fp16, else fp32.
+
+    bf16 matches fp16 throughput on Ampere+ but keeps fp32's exponent
+    range, so the framework skips the defensive upcasts and overflow
+    handling that fp16 LayerNorm/softmax paths need.
+    """
+    if torch.cuda.is_available():
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    return torch.float32
+
+def _hf_device_map(weight_bytes: int):
+    """Pick between explicit GPU placement and accelerate's device_map.
+
+    device_map='auto' routes every forward through Accelerate dispatch
+    hooks - real per-layer overhead on models this small. When free VRAM
+    comfortably covers the weights, return None so the caller can load
+    normally and move the whole model with one .to('cuda'); 'auto' is kept
+    only as the doesn't-fit fallback.
+    """
+    if not torch.cuda.is_available():
+        return None
+    free, _ = torch.cuda.mem_get_info()
+    return None if weight_bytes * 1.2 < free else "auto"
+
+# Rule-based annotation patterns, compiled once at import time so each
+# request pays a dict lookup instead of a regex parser pass
+# (compiled_pattern, replacement, min_intensity)
+EMOTION_RULES = [
+    (re.compile(r'\b(ha ha|haha|funny|joke|humor)\b', re.IGNORECASE), r'\1 (laughs)', 0.2),
+    (re.compile(r'\b(oh dear|oh no|unfortunately|sadly)\b', re.IGNORECASE), r'\1 (sighs)', 0.3),
+    (re.compile(r'\b(wow|amazing|incredible|unbelievable)\b', re.IGNORECASE), r'\1 (gasps)', 0.4),
+    (re.compile(r'\b(whisper|quietly|softly)\b', re.IGNORECASE), r'\1 (whispers)', 0.1),
+    (re.compile(r'\b(ahem|um|well)\b', re.IGNORECASE), r'\1 (clears throat)', 0.3),
+    (re.compile(r'\b(tired|exhausted|weary)\b', re.IGNORECASE), r'\1 (sighs)', 0.2),
+    (re.compile(r'\b(surprise|shocked|startled)\b', re.IGNORECASE), r'\1 (gasps)', 0.4),
+    (re.compile(r'\b(cough|cold|sick)\b', re.IGNORECASE), r'\1 (coughs)', 0.3),
+]
+
+# Fused alternation over all emotion rules: one linear scan of the text
+# instead of one scan per rule. Inner groups are made non-capturing so
+# match.lastgroup reliably names the rule that fired.
+EMOTION_SCAN_RE = re.compile(
+    '|'.join(
+        f"(?P<g{i}>{pattern.pattern.replace('(', '(?:')})"
+        for i, (pattern, _, _) in enumerate(EMOTION_RULES)
+    ),
+    re.IGNORECASE,
+)
+EMOTION_SUFFIXES = [replacement.replace(r'\1', '') for _, replacement, _ in EMOTION_RULES]
+
+# Emotion rules plus the pause/breath insertions in one combined scan. The
+# pause alternative precedes the paragraph-break one so '.\n\n' resolves the
+# same way it did when the passes ran sequentially.
+ANNOTATION_SCAN_RE = re.compile(
+    EMOTION_SCAN_RE.pattern + r'|(?P<pause>[.!?]\s+)|(?P<breath>\n\n+)',
+    re.IGNORECASE,
+)
+
+# Comma and sentence-end pause insertions fused into one alternation; the
+# replacements introduce no new punctuation, so a single pass produces the
+# same text the two sequential passes did
+NATURAL_PAUSE_RE = re.compile(r',(?P<cws>\s+)|(?P<end>[.!?])(?P<ews>\s+)(?!\()')
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+def _natural_pause_repl(match):
+    cws = match.group('cws')
+    if cws is not None:
+        return ', (brief pause)' + cws
+    return match.group('end') + ' (pauses)' + match.group('ews')
+
+# LRU cache of per-chunk annotation results - repeat requests for the same
+# passage (retries, re-annotating an edited book) skip the model call entirely
+ANNOTATION_CACHE_SIZE = 1024
+_annotation_cache: OrderedDict = OrderedDict()
+
+# Chunk count from which the rule-based path fans out across CPU cores; below
+# this the process-pool startup costs more than the regex work it saves
+RULE_PARALLEL_MIN_CHUNKS = 64
+
+def annotate_text_with_rules(text: str, intensity: float) -> str:
+    """Single-pass rule-based annotation of one chunk.
+
+    Module-level (rather than a method) so a ProcessPoolExecutor can ship it
+    to workers without pickling the annotator.
+    """
+    # Cheap presence probe first: typical narration matches no rule at all,
+    # and a single search is far cheaper than the substitution pass
+    if EMOTION_SCAN_RE.search(text) is None:
+        active = set()
+    else:
+        # Roll which rules fire for this chunk (same per-rule gating as
+        # before), then annotate every match in a single pass over the text
+        active = {
+            f'g{i}'
+            for i, (_, _, min_intensity) in enumerate(EMOTION_RULES)
+            if intensity >= min_intensity and random.random() < intensity
+        }
+
+    # Same cheap screening for the pause/breath alternatives: a membership
+    # probe is far cheaper than letting the combined sub visit their matches
+    add_pauses = intensity > 0.3 and ('.' in text or '!' in text or '?' in text)
+    add_breaths = intensity > 0.5 and '\n\n' in text
+
+    if not active and not add_pauses and not add_breaths:
+        return text
+
+    def _annotate_match(match):
+        group = match.lastgroup
+        if group == 'pause':
+            if add_pauses:
+                return match.group(0)[0] + ' (pauses) '
+        elif group == 'breath':
+            if add_breaths:
+                return ' (inhales) '
+        elif group in active:
+            return match.group(0) + EMOTION_SUFFIXES[int(group[1:])]
+        return match.group(0)
+
+    return ANNOTATION_SCAN_RE.sub(_annotate_match, text)
+
 class LocalAnnotator:
     def __init__(self, model_type="rule-based"):
         self.model_type = model_type
         self.model = None
         self.tokenizer = None
+        self._http = None  # pooled keep-alive session for Ollama calls
+        self._prompt_ids_cache = {}  # intensity bucket -> tokenized prompt prefix/suffix
         
         if model_type == "phi-2" and HF_AVAILABLE:
             self.load_phi2_model()
@@ -42,17 +227,34 @@ class LocalAnnotator:
             model_name = "microsoft/phi-2"
             print(f"Loading {model_name}...")
             
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                trust_remote_code=True,
-                device_map="auto" if torch.cuda.is_available() else None
-            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True, use_fast=True)
+            quant_cfg = _hf_quantization_config()
+            if quant_cfg is not None:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    quantization_config=quant_cfg,
+                    torch_dtype=torch.bfloat16,
+                    trust_remote_code=True,
+                    device_map="auto"
+                )
+            else:
+                device_map = _hf_device_map(2 * 2_700_000_000)  # fp16 weights, 2.7B params
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    torch_dtype=_hf_dtype(),
+                    trust_remote_code=True,
+                    device_map=device_map
+                )
+                if device_map is None and torch.cuda.is_available():
+                    self.model = self.model.to("cuda")
             
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
-                
+
+            # Inference only: fixes Dropout/LayerNorm behavior and lets
+            # inductor apply eval-mode optimizations when compiling
+            self.model.eval()
+            self._maybe_compile_model()
             print("Phi-2 model loaded successfully!")
             
         except Exception as e:
@@ -65,114 +267,269 @@ class LocalAnnotator:
             model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
             print(f"Loading {model_name}...")
             
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                device_map="auto" if torch.cuda.is_available() else None
-            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            quant_cfg = _hf_quantization_config()
+            if quant_cfg is not None:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    quantization_config=quant_cfg,
+                    torch_dtype=torch.bfloat16,
+                    device_map="auto"
+                )
+            else:
+                device_map = _hf_device_map(2 * 1_100_000_000)  # fp16 weights, 1.1B params
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    torch_dtype=_hf_dtype(),
+                    device_map=device_map
+                )
+                if device_map is None and torch.cuda.is_available():
+                    self.model = self.model.to("cuda")
             
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
-                
+
+            self.model.eval()
+            self._maybe_compile_model()
             print("TinyLlama model loaded successfully!")
             
         except Exception as e:
             print(f"Failed to load TinyLlama: {e}")
             self.model_type = "rule-based"
     
+    def _maybe_compile_model(self):
+        """Optionally torch.compile the loaded model (TORCH_COMPILE=1).
+
+        Small-batch autoregressive decode is dominated by per-step Python
+        dispatch; reduce-overhead mode amortizes it away. A tiny warmup
+        generate pays the one-time tracing cost here instead of on the
+        first real chunk. Opt-in because a one-shot CLI run won't recoup
+        the compile time - it pays off when annotating many chunks.
+        """
+        if os.getenv("TORCH_COMPILE", "0") != "1":
+            return
+        try:
+            print("Compiling annotation model with torch.compile...")
+            # A static KV cache keeps decode shapes stable, which is what
+            # lets reduce-overhead mode capture and replay CUDA graphs
+            # instead of re-dispatching every step
+            self.model.generation_config.cache_implementation = "static"
+            self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+            warmup = self.tokenizer("Warm up.", return_tensors="pt").to(self.model.device)
+            self.model.generate(**warmup, max_new_tokens=8, pad_token_id=self.tokenizer.eos_token_id)
+        except Exception as e:
+            print(f"torch.compile failed, using eager model: {e}")
+
     def setup_ollama(self):
         """Setup Ollama connection for local models"""
         try:
             import requests
-            
-            # Test if Ollama is running
-            response = requests.get("http://localhost:11434/api/tags")
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                
-                # Look for small models
-                preferred_models = ["llama3.2:1b", "phi3:3.8b", "gemma2:2b", "qwen2:1.5b"]
-                available_model = None
-                
-                for model in preferred_models:
-                    if any(m["name"].startswith(model) for m in models):
-                        available_model = model
-                        break
-                
-                if available_model:
-                    self.ollama_model = available_model
-                    print(f"Using Ollama model: {available_model}")
-                else:
-                    print("No suitable Ollama models found, using rule-based")
-                    self.model_type = "rule-based"
+
+            # One pooled session - keeps the connection to Ollama alive across
+            # chunks instead of paying a TCP handshake per call
+            self._http = requests.Session()
+            self._http.mount("http://", requests.adapters.HTTPAdapter(
+                pool_connections=4, pool_maxsize=8))
+
+            # Discovery is cached process-wide, so building several
+            # annotators only hits /api/tags once
+            available_model = _discover_ollama_model()
+            if available_model:
+                self.ollama_model = available_model
+                print(f"Using Ollama model: {available_model}")
             else:
-                print("Ollama not available, using rule-based")
                 self.model_type = "rule-based"
-                
+
         except Exception as e:
             print(f"Ollama setup failed: {e}")
             self.model_type = "rule-based"
     
+    def _cache_key(self, text: str, intensity: float) -> tuple:
+        # Bucket intensity to 0.1 increments so near-identical settings share entries
+        return (
+            hashlib.blake2b(text.encode(), digest_size=16).digest(),
+            round(intensity, 1),
+            self.model_type,
+        )
+
     def annotate_with_model(self, text: str, intensity: float) -> str:
         """Use AI model to add emotional annotations"""
-        
+        key = self._cache_key(text, intensity)
+        cached = _annotation_cache.get(key)
+        if cached is not None:
+            _annotation_cache.move_to_end(key)
+            return cached
+
         if self.model_type == "ollama":
-            return self.annotate_with_ollama(text, intensity)
+            result = self.annotate_with_ollama(text, intensity)
         elif self.model and self.tokenizer:
-            return self.annotate_with_hf_model(text, intensity)
+            result = self.annotate_with_hf_model(text, intensity)
         else:
-            return self.annotate_with_rules(text, intensity)
+            result = self.annotate_with_rules(text, intensity)
+
+        _annotation_cache[key] = result
+        if len(_annotation_cache) > ANNOTATION_CACHE_SIZE:
+            _annotation_cache.popitem(last=False)
+        return result
     
-    def annotate_with_hf_model(self, text: str, intensity: float) -> str:
-        """Use HuggingFace model for annotation"""
-        try:
-            intensity_desc = "subtle" if intensity < 0.4 else "moderate" if intensity < 0.7 else "expressive"
-            
-            prompt = f"""Add emotional annotations to make this text more engaging for audiobook narration.
+    HF_PROMPT_SUFFIX = "\n\nAnnotated version:"
+
+    def _hf_prompt_prefix(self, intensity: float) -> str:
+        """The constant instruction block preceding the chunk text"""
+        intensity_desc = _intensity_desc(intensity)
+
+        return f"""Add emotional annotations to make this text more engaging for audiobook narration.
 Rules:
 - Add emotions like (laughs), (sighs), (whispers), (gasps), etc.
 - Use {intensity_desc} emotions
 - Keep original text unchanged, only add annotations in parentheses
 - Don't overuse - be strategic
 
-Text: {text}
+Text: """
 
-Annotated version:"""
+    def _build_hf_prompt(self, text: str, intensity: float) -> str:
+        """Build the annotation prompt for the HF models"""
+        return self._hf_prompt_prefix(intensity) + text + self.HF_PROMPT_SUFFIX
+
+    def _hf_prompt_ids(self, intensity: float):
+        """Tokenized prompt prefix/suffix, cached per intensity bucket.
+
+        The instruction block is ~80 tokens and identical for every chunk;
+        tokenizing it once means the per-chunk call only tokenizes the
+        chunk text itself.
+        """
+        intensity_desc = _intensity_desc(intensity)
+        cached = self._prompt_ids_cache.get(intensity_desc)
+        if cached is None:
+            prefix_ids = self.tokenizer(self._hf_prompt_prefix(intensity),
+                                        return_tensors="pt").input_ids
+            suffix_ids = self.tokenizer(self.HF_PROMPT_SUFFIX, return_tensors="pt",
+                                        add_special_tokens=False).input_ids
+            cached = (prefix_ids, suffix_ids)
+            self._prompt_ids_cache[intensity_desc] = cached
+        return cached
+
+    def _extract_hf_annotation(self, generated: str) -> str:
+        """Pull the annotated text out of a decoded generation ('' on failure)"""
+        # rpartition scans once from the right instead of splitting the
+        # whole generation into a list
+        _, marker, annotated = generated.rpartition("Annotated version:")
+        return annotated.strip() if marker else ""
+
+    def annotate_with_hf_model(self, text: str, intensity: float) -> str:
+        """Use HuggingFace model for annotation"""
+        try:
+            prefix_ids, suffix_ids = self._hf_prompt_ids(intensity)
+            chunk_ids = self.tokenizer(
+                text, return_tensors="pt", add_special_tokens=False, truncation=True,
+                max_length=max(512 - prefix_ids.shape[1] - suffix_ids.shape[1], 1)
+            ).input_ids
+            input_ids = torch.cat([prefix_ids, chunk_ids, suffix_ids], dim=1)
+            inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
 
-            inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
-            
             if torch.cuda.is_available():
-                inputs = {k: v.cuda() for k, v in inputs.items()}
-            
-            with torch.no_grad():
+                # One async H2D copy per tensor instead of a blocking
+                # .cuda() round-trip; generate() syncs on first use
+                inputs = {k: v.to(self.model.device, non_blocking=True) for k, v in inputs.items()}
+
+            # Bucket the token budget to two fixed sizes so a compiled graph
+            # is reused across chunks instead of re-specialized per length
+            max_new_tokens = 128 if len(text) + 100 <= 128 else 300
+
+            with torch.inference_mode():
                 outputs = self.model.generate(
                     **inputs,
-                    max_new_tokens=min(len(text) + 100, 300),
+                    max_new_tokens=max_new_tokens,
                     temperature=0.7,
                     do_sample=True,
+                    use_cache=True,
                     pad_token_id=self.tokenizer.eos_token_id
                 )
             
             result = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            # Extract the annotated version
-            if "Annotated version:" in result:
-                annotated = result.split("Annotated version:")[-1].strip()
-                return annotated if annotated else self.annotate_with_rules(text, intensity)
-            else:
-                return self.annotate_with_rules(text, intensity)
-                
+
+            annotated = self._extract_hf_annotation(result)
+            return annotated if annotated else self.annotate_with_rules(text, intensity)
+
         except Exception as e:
             print(f"Model annotation failed: {e}")
             return self.annotate_with_rules(text, intensity)
+
+    HF_MAX_BATCH = 8
+
+    def annotate_with_hf_batch(self, chunks: List[str], intensity: float) -> List[str]:
+        """Annotate several chunks with padded batch generate calls.
+
+        A chunk-at-a-time loop pays full prefill and kernel-launch overhead
+        at batch size 1; padding the prompts into batches of HF_MAX_BATCH
+        lets decode throughput scale with the batch while bounding memory.
+        """
+        # Serve cached chunks first and only batch the misses
+        results = [None] * len(chunks)
+        misses = []
+        for i, chunk in enumerate(chunks):
+            cached = _annotation_cache.get(self._cache_key(chunk, intensity))
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+
+        if not misses:
+            return results
+
+        miss_chunks = [chunks[i] for i in misses]
+        try:
+            # Decoder-only models must pad on the left so generation
+            # continues from real tokens, not padding
+            self.tokenizer.padding_side = "left"
+
+            annotated = []
+            for start in range(0, len(miss_chunks), self.HF_MAX_BATCH):
+                batch = miss_chunks[start:start + self.HF_MAX_BATCH]
+                prompts = [self._build_hf_prompt(chunk, intensity) for chunk in batch]
+                inputs = self.tokenizer(prompts, return_tensors="pt", padding=True,
+                                        truncation=True, max_length=512)
+
+                if torch.cuda.is_available():
+                    # BatchEncoding moves all tensors in one call
+                    inputs = inputs.to(self.model.device, non_blocking=True)
+
+                max_new_tokens = 128 if max(len(c) for c in batch) + 100 <= 128 else 300
+
+                with torch.inference_mode():
+                    outputs = self.model.generate(
+                        **inputs,
+                        max_new_tokens=max_new_tokens,
+                        temperature=0.7,
+                        do_sample=True,
+                        use_cache=True,
+                        pad_token_id=self.tokenizer.eos_token_id
+                    )
+
+                for chunk, decoded in zip(batch, self.tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                    extracted = self._extract_hf_annotation(decoded)
+                    annotated.append(extracted if extracted else self.annotate_with_rules(chunk, intensity))
+
+        except Exception as e:
+            print(f"Batch model annotation failed: {e}")
+            annotated = [self.annotate_with_hf_model(chunk, intensity) for chunk in miss_chunks]
+
+        for i, result in zip(misses, annotated):
+            results[i] = result
+            _annotation_cache[self._cache_key(chunks[i], intensity)] = result
+            if len(_annotation_cache) > ANNOTATION_CACHE_SIZE:
+                _annotation_cache.popitem(last=False)
+
+        return results
     
     def annotate_with_ollama(self, text: str, intensity: float) -> str:
         """Use Ollama for annotation"""
         try:
-            import requests
-            
-            intensity_desc = "subtle" if intensity < 0.4 else "moderate" if intensity < 0.7 else "expressive"
+            if self._http is None:
+                import requests
+                self._http = requests.Session()
+
+            intensity_desc = _intensity_desc(intensity)
             
             prompt = f"""Add {intensity_desc} emotional annotations to this text for audiobook narration. Only add emotions in parentheses like (laughs), (sighs), (whispers). Keep the original text exactly the same.
 
@@ -183,17 +540,38 @@ Annotated:"""
             data = {
                 "model": self.ollama_model,
                 "prompt": prompt,
-                "stream": False,
+                "stream": True,
+                # Keep the model resident between chunk calls; Ollama's
+                # default keep-alive is short enough to unload it mid-run
+                "keep_alive": "5m",
                 "options": {
                     "temperature": 0.7,
-                    "num_predict": min(len(text) + 50, 200)
+                    "num_predict": min(len(text) + 50, 200),
+                    # Let the server stop as soon as the model runs past the
+                    # answer instead of generating to the num_predict budget
+                    "stop": ["\n\n", "Text:"]
                 }
             }
-            
-            response = requests.post("http://localhost:11434/api/generate", json=data, timeout=30)
-            
+
+            response = self._http.post("http://localhost:11434/api/generate", json=data, timeout=30, stream=True)
+
             if response.status_code == 200:
-                result = response.json().get("response", "").strip()
+                # Accumulate streamed fragments and bail out early if the
+                # model rambles far past a plausible annotated length
+                max_chars = 2 * len(text) + 200
+                parts = []
+                total = 0
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    payload = json.loads(line)
+                    fragment = payload.get("response", "")
+                    parts.append(fragment)
+                    total += len(fragment)
+                    if payload.get("done") or total > max_chars:
+                        break
+                response.close()
+                result = "".join(parts).strip()
                 return result if result else self.annotate_with_rules(text, intensity)
             else:
                 return self.annotate_with_rules(text, intensity)
@@ -202,40 +580,93 @@ Annotated:"""
             print(f"Ollama annotation failed: {e}")
             return self.annotate_with_rules(text, intensity)
     
+    OLLAMA_BATCH_SEPARATOR = "<<<CHUNK>>>"
+
+    # Concurrent request cap for per-chunk Ollama calls; matches the typical
+    # OLLAMA_NUM_PARALLEL slot count
+    OLLAMA_PARALLEL = int(os.getenv("OLLAMA_PARALLEL", "4"))
+
+    def annotate_with_ollama_batch(self, chunks: List[str], intensity: float) -> List[str]:
+        """Annotate several chunks with a single Ollama call.
+
+        Coalescing the chunks into one prompt pays the HTTP round-trip and
+        prompt-eval overhead once instead of once per chunk. Falls back to
+        per-chunk calls if the model mangles the separators.
+        """
+        # Serve cached chunks first and only batch the misses
+        results = [None] * len(chunks)
+        misses = []
+        for i, chunk in enumerate(chunks):
+            cached = _annotation_cache.get(self._cache_key(chunk, intensity))
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+
+        if not misses:
+            return results
+
+        miss_chunks = [chunks[i] for i in misses]
+        batched = None
+        if len(miss_chunks) > 1:
+            try:
+                intensity_desc = _intensity_desc(intensity)
+                sep = self.OLLAMA_BATCH_SEPARATOR
+                joined = f"\n{sep}\n".join(miss_chunks)
+
+                prompt = f"""Add {intensity_desc} emotional annotations to each text section for audiobook narration. Only add emotions in parentheses like (laughs), (sighs), (whispers). Keep the original text exactly the same. Sections are separated by {sep} - keep every separator in place.
+
+{joined}
+
+Annotated:"""
+
+                data = {
+                    "model": self.ollama_model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "keep_alive": "5m",
+                    "options": {
+                        "temperature": 0.7,
+                        "num_predict": min(sum(len(c) for c in miss_chunks) + 50 * len(miss_chunks), 1000)
+                    }
+                }
+
+                response = self._http.post("http://localhost:11434/api/generate", json=data, timeout=60)
+
+                if response.status_code == 200:
+                    result = response.json().get("response", "").strip()
+                    parts = [p.strip() for p in result.split(sep)]
+                    parts = [p for p in parts if p]
+                    if len(parts) == len(miss_chunks):
+                        batched = parts
+
+            except Exception as e:
+                print(f"Ollama batch annotation failed: {e}")
+
+        if batched is None:
+            if len(miss_chunks) > 1:
+                # Per-chunk requests run concurrently up to Ollama's parallel
+                # slot count, hiding queueing and prefill latency per chunk
+                with ThreadPoolExecutor(max_workers=self.OLLAMA_PARALLEL) as pool:
+                    batched = list(pool.map(
+                        lambda chunk: self.annotate_with_ollama(chunk, intensity),
+                        miss_chunks))
+            else:
+                batched = [self.annotate_with_ollama(chunk, intensity) for chunk in miss_chunks]
+
+        for i, annotated in zip(misses, batched):
+            results[i] = annotated
+            _annotation_cache[self._cache_key(chunks[i], intensity)] = annotated
+            if len(_annotation_cache) > ANNOTATION_CACHE_SIZE:
+                _annotation_cache.popitem(last=False)
+
+        return results
+
     def annotate_with_rules(self, text: str, intensity: float) -> str:
         """Rule-based annotation as fallback"""
         print("Using rule-based annotation")
-        
-        annotated = text
-        
-        # Define emotion patterns and their probabilities based on intensity
-        emotion_rules = [
-            # Pattern, replacement, min_intensity
-            (r'\b(ha ha|haha|funny|joke|humor)\b', r'\1 (laughs)', 0.2),
-            (r'\b(oh dear|oh no|unfortunately|sadly)\b', r'\1 (sighs)', 0.3),
-            (r'\b(wow|amazing|incredible|unbelievable)\b', r'\1 (gasps)', 0.4),
-            (r'\b(whisper|quietly|softly)\b', r'\1 (whispers)', 0.1),
-            (r'\b(ahem|um|well)\b', r'\1 (clears throat)', 0.3),
-            (r'\b(tired|exhausted|weary)\b', r'\1 (sighs)', 0.2),
-            (r'\b(surprise|shocked|startled)\b', r'\1 (gasps)', 0.4),
-            (r'\b(cough|cold|sick)\b', r'\1 (coughs)', 0.3),
-        ]
-        
-        # Apply rules based on intensity
-        for pattern, replacement, min_intensity in emotion_rules:
-            if intensity >= min_intensity and random.random() < intensity:
-                annotated = re.sub(pattern, replacement, annotated, flags=re.IGNORECASE)
-        
-        # Add pauses at sentence endings
-        if intensity > 0.3:
-            annotated = re.sub(r'([.!?])\s+', r'\1 (pauses) ', annotated)
-        
-        # Add breathing at paragraph breaks
-        if intensity > 0.5:
-            annotated = re.sub(r'\n\n+', r' (inhales) ', annotated)
-        
-        return annotated
-    
+        return annotate_text_with_rules(text, intensity)
+
     def annotate(self, text: str, settings: Dict) -> str:
         """Main annotation method"""
         if not settings.get('addEmotions', False):
@@ -245,12 +676,24 @@ Annotated:"""
         
         # Process text in chunks to avoid overwhelming small models
         chunks = self.split_text_into_chunks(text, max_length=200)
-        annotated_chunks = []
-        
-        for chunk in chunks:
-            annotated_chunk = self.annotate_with_model(chunk, intensity)
-            annotated_chunks.append(annotated_chunk)
-        
+
+        if self.model_type == "ollama" and len(chunks) > 1:
+            # One coalesced request instead of a round-trip per chunk
+            annotated_chunks = self.annotate_with_ollama_batch(chunks, intensity)
+        elif self.model and self.tokenizer and len(chunks) > 1:
+            # One padded generate per batch instead of a call per chunk
+            annotated_chunks = self.annotate_with_hf_batch(chunks, intensity)
+        elif self.model_type == "rule-based" and len(chunks) >= RULE_PARALLEL_MIN_CHUNKS:
+            # Book-length input on the pure-CPU path: chunks are independent,
+            # so fan the regex work out across cores
+            print("Using rule-based annotation")
+            with ProcessPoolExecutor() as pool:
+                annotated_chunks = list(pool.map(
+                    annotate_text_with_rules, chunks, [intensity] * len(chunks),
+                    chunksize=16))
+        else:
+            annotated_chunks = [self.annotate_with_model(chunk, intensity) for chunk in chunks]
+
         result = ' '.join(annotated_chunks)
         
         # Add natural pauses if enabled
@@ -260,37 +703,48 @@ Annotated:"""
         return result
     
     def split_text_into_chunks(self, text: str, max_length: int = 200) -> List[str]:
-        """Split text into manageable chunks"""
-        sentences = re.split(r'[.!?]+', text)
+        """Split text into manageable chunks.
+
+        Sentences are sliced straight out of the text via finditer and
+        collected in a list that is joined once per flushed chunk - repeated
+        `current_chunk +=` is quadratic on book-length input.
+        """
         chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
+        parts = []      # sentences of the chunk being built
+        parts_len = 0
+        pos = 0
+
+        for match in SENTENCE_SPLIT_RE.finditer(text):
+            sentence = text[pos:match.start()].strip()
+            pos = match.end()
             if not sentence:
                 continue
-                
-            if len(current_chunk) + len(sentence) < max_length:
-                current_chunk += sentence + ". "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + ". "
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
+
+            if parts and parts_len + len(sentence) >= max_length:
+                chunks.append(''.join(parts).rstrip())
+                parts = []
+                parts_len = 0
+            parts.append(sentence + '. ')
+            parts_len += len(sentence) + 2
+
+        # Trailing text after the last sentence terminator
+        tail = text[pos:].strip()
+        if tail:
+            if parts and parts_len + len(tail) >= max_length:
+                chunks.append(''.join(parts).rstrip())
+                parts = []
+            parts.append(tail + '. ')
+
+        if parts:
+            chunks.append(''.join(parts).rstrip())
+
         return chunks if chunks else [text]
     
     def add_natural_pauses(self, text: str) -> str:
         """Add natural pauses at punctuation"""
-        # Add brief pauses at commas
-        text = re.sub(r',(\s+)', r', (brief pause)\1', text)
-        
-        # Add pauses at sentence endings (if not already added)
-        text = re.sub(r'([.!?])(\s+)(?!\()', r'\1 (pauses)\2', text)
-        
-        return text
+        # Brief pauses at commas and pauses at unmarked sentence endings,
+        # inserted in one scan of the text
+        return NATURAL_PAUSE_RE.sub(_natural_pause_repl, text)
 
 def main():
     parser = argparse.ArgumentParser(description='Local AI annotation for audiobook studio')
@@ -4,26 +4,103 @@ Audiobook Studio Setup Script
 Interactive setup with user confirmation for each step
 """
 
+import argparse
 import subprocess
 import sys
 import os
 import json
+import hashlib
+import shutil
+import venv
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 def run_command(cmd, capture_output=True, check=True):
-    """Run a shell command"""
+    """Run a command given as an argv list (no shell)"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=capture_output, text=True, check=check)
+        result = subprocess.run(cmd, capture_output=capture_output, text=True, check=check)
         return result.stdout.strip() if capture_output else None
     except subprocess.CalledProcessError as e:
         if capture_output:
-            print(f"❌ Error running command: {cmd}")
+            print(f"❌ Error running command: {' '.join(cmd)}")
             print(f"Error: {e.stderr}")
         return None
 
+# Step-completion markers so an idempotent re-run skips work that is already
+# done; --force ignores the file. Python deps have their own marker inside
+# the venv (.req_hash) so it disappears with the venv itself.
+SETUP_STATE_FILE = Path(".setup_state.json")
+FORCE_RERUN = False
+
+def _file_hash(path):
+    """blake2b hex digest of a file, or '' if it does not exist"""
+    path = Path(path)
+    if not path.exists():
+        return ""
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+def _read_setup_state():
+    try:
+        return json.loads(SETUP_STATE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _load_setup_state():
+    # --force pretends no step has run yet; the file itself is untouched so
+    # a forced run still merges its results into the existing markers
+    return {} if FORCE_RERUN else _read_setup_state()
+
+def _save_setup_state(**updates):
+    state = _read_setup_state()
+    state.update(updates)
+    SETUP_STATE_FILE.write_text(json.dumps(state, indent=2) + "\n")
+
+def _requirements_fingerprint():
+    """Fingerprint of requirements.txt for the current interpreter/platform.
+
+    Stored in the venv after a successful install so later runs can tell
+    whether pip has anything to do at all.
+    """
+    digest = hashlib.sha256(Path("requirements.txt").read_bytes())
+    digest.update(f"py{sys.version_info.major}.{sys.version_info.minor}-{sys.platform}".encode())
+    return digest.hexdigest()
+
+@dataclass(frozen=True)
+class EnvProbe:
+    """One-shot snapshot of the machine taken before any install step."""
+    cpu_count: int
+    free_gb: float
+    online: bool
+
+def _probe_environment():
+    """Check disk space and network reachability once, up front.
+
+    The installs below pull several GB (torch alone is ~2GB, Chatterbox
+    downloads its model on first use), so it is better to warn before
+    spending minutes on a download that will fill the disk or time out.
+    """
+    free_gb = shutil.disk_usage(".").free / (1024 ** 3)
+    try:
+        urllib.request.urlopen(
+            urllib.request.Request("https://pypi.org", method="HEAD"), timeout=2
+        )
+        online = True
+    except OSError:
+        online = False
+    return EnvProbe(cpu_count=os.cpu_count() or 1, free_gb=free_gb, online=online)
+
+# Set by --yes: every prompt silently takes its default, so the script can
+# run unattended (CI, containers) without blocking on input()
+ASSUME_DEFAULTS = False
+
 def ask_yes_no(question, default="y"):
     """Ask a yes/no question with default"""
     choices = "[Y/n]" if default.lower() == "y" else "[y/N]"
+    if ASSUME_DEFAULTS:
+        print(f"{question} {choices}: {default}")
+        return default.lower() == "y"
     while True:
         answer = input(f"{question} {choices}: ").strip().lower()
         if not answer:
@@ -47,7 +124,11 @@ def setup_chatterbox_tts():
     print("✅ No speaker tags or annotations needed")
     print("✅ Just plain text → high-quality speech!")
     print("")
-    
+
+    if Path("backend/venv/bin/python").exists() and _load_setup_state().get("chatterbox"):
+        print("✅ Chatterbox TTS already installed")
+        return True
+
     if ask_yes_no("Do you want to install Chatterbox TTS?"):
         print("📦 Installing Chatterbox TTS...")
         
@@ -59,7 +140,8 @@ def setup_chatterbox_tts():
                 subprocess.run([str(venv_python), "-m", "pip", "install", "chatterbox-tts"], check=True)
                 print("✅ Chatterbox TTS installed successfully!")
                 
-                # Test the installation
+                # Test the installation - the check runs via -c, so there is
+                # no temp file to clean up (or leak on Ctrl-C)
                 print("🧪 Testing Chatterbox installation...")
                 test_script = '''
 try:
@@ -70,12 +152,9 @@ except ImportError as e:
     print(f"❌ Import failed: {e}")
     exit(1)
 '''
-                with open("test_chatterbox.py", "w") as f:
-                    f.write(test_script)
-                
-                subprocess.run([str(venv_python), "test_chatterbox.py"], check=True)
-                os.remove("test_chatterbox.py")
-                
+                subprocess.run([str(venv_python), "-c", test_script], check=True)
+
+                _save_setup_state(chatterbox=True)
                 print("🎉 Chatterbox TTS is ready!")
                 print("💡 The model will download automatically on first use (~2GB)")
                 return True
@@ -85,8 +164,6 @@ except ImportError as e:
                 
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to install Chatterbox TTS: {e}")
-            if os.path.exists("test_chatterbox.py"):
-                os.remove("test_chatterbox.py")
             return False
     else:
         print("⚠️  Skipping Chatterbox TTS setup")
@@ -103,7 +180,6 @@ def create_virtual_environment():
         print("✅ Virtual environment already exists")
         if ask_yes_no("Do you want to recreate it?"):
             print("Removing existing virtual environment...")
-            import shutil
             shutil.rmtree(venv_path)
         else:
             return True
@@ -113,17 +189,20 @@ def create_virtual_environment():
     
     if ask_yes_no("Do you want to create a virtual environment?"):
         try:
-            result = subprocess.run([sys.executable, "-m", "venv", str(venv_path)], check=True)
+            # Building in-process skips a full interpreter startup, and
+            # symlinking (on non-Windows) skips copying the stdlib
+            builder = venv.EnvBuilder(with_pip=True, symlinks=sys.platform != "win32")
+            builder.create(str(venv_path))
             print("✅ Successfully created virtual environment")
             return True
-        except subprocess.CalledProcessError as e:
+        except (OSError, subprocess.CalledProcessError) as e:
             print(f"❌ Failed to create virtual environment: {e}")
             return False
     else:
         print("⚠️  Skipping virtual environment creation")
         return False
 
-def install_dependencies():
+def install_dependencies(deferred=False):
     """Install Python dependencies with virtual environment"""
     print("\n📚 PYTHON DEPENDENCIES")
     print("=" * 35)
@@ -138,14 +217,20 @@ def install_dependencies():
         else:
             return False
     
-    # Determine pip path based on OS
+    # Determine interpreter path based on OS
     if sys.platform == "win32":
-        pip_path = venv_path / "Scripts" / "pip"
         python_path = venv_path / "Scripts" / "python"
     else:
-        pip_path = venv_path / "bin" / "pip"
         python_path = venv_path / "bin" / "python"
-    
+
+    # Fast path before any prompting: a venv already populated from this
+    # exact requirements.txt has nothing to install, so don't even ask
+    marker = venv_path / ".req_hash"
+    fingerprint = _requirements_fingerprint()
+    if marker.exists() and marker.read_text().strip() == fingerprint:
+        print("✅ Dependencies already installed (requirements.txt unchanged)")
+        return True
+
     print("Required Python packages:")
     print("  - fastapi (web framework)")
     print("  - torch (PyTorch for AI)")
@@ -155,51 +240,74 @@ def install_dependencies():
     print("  - uvicorn (web server)")
     print(f"\nUsing virtual environment: {venv_path}")
     
-    if ask_yes_no("Do you want to install Python dependencies?"):
+    if not ask_yes_no("Do you want to install Python dependencies?"):
+        print("⚠️  Skipping Python dependencies")
+        return False
+
+    def _do_install():
         print("Installing Python dependencies in virtual environment...")
         try:
-            # Upgrade pip first
-            subprocess.run([str(pip_path), "install", "--upgrade", "pip"], check=True)
-            print("✅ Upgraded pip")
-            
-            # Install requirements
-            subprocess.run([str(pip_path), "install", "-r", "requirements.txt"], check=True)
+            # The venv was built with_pip=True, so ensurepip's bundled pip is
+            # already in place - installing the requirements is the only pip
+            # run needed, with no self-upgrade round-trip to PyPI first
+            subprocess.run([
+                str(python_path), "-m", "pip", "install", "--upgrade",
+                "--prefer-binary", "--no-input", "--disable-pip-version-check",
+                "-r", "requirements.txt"
+            ], check=True)
+            marker.write_text(fingerprint + "\n")
             print("✅ Successfully installed Python dependencies")
             return True
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to install dependencies: {e}")
             return False
-    else:
-        print("⚠️  Skipping Python dependencies")
-        return False
 
-def install_node_dependencies():
+    # deferred=True hands the confirmed install back to the caller so it can
+    # overlap with other network-bound steps
+    return _do_install if deferred else _do_install()
+
+def install_node_dependencies(deferred=False):
     """Install Node.js dependencies with confirmation"""
     print("\n📦 NODE.JS DEPENDENCIES")
     print("=" * 35)
-    
+
     if not Path("package.json").exists():
         print("❌ package.json not found")
         return False
-        
+
+    lock_hash = _file_hash("package-lock.json") or _file_hash("package.json")
+    if Path("node_modules").exists() and _load_setup_state().get("node_deps") == lock_hash:
+        print("✅ Node.js dependencies already installed (lockfile unchanged)")
+        return True
+
     print("Required Node.js packages:")
     print("  - Next.js (React framework)")
     print("  - TypeScript (type safety)")
     print("  - Tailwind CSS (styling)")
     print("  - Framer Motion (animations)")
-    
-    if ask_yes_no("Do you want to install Node.js dependencies?"):
+
+    if not ask_yes_no("Do you want to install Node.js dependencies?"):
+        print("⚠️  Skipping Node.js dependencies")
+        return False
+
+    def _do_install():
         print("Installing Node.js dependencies...")
         try:
-            subprocess.run(["npm", "install"], check=True)
+            # npm ci installs exactly the lockfile - no resolver pass, no
+            # audit round-trip - and prefers already-cached tarballs
+            if Path("package-lock.json").exists():
+                npm_cmd = ["npm", "ci", "--prefer-offline", "--no-audit", "--no-fund"]
+            else:
+                npm_cmd = ["npm", "install"]
+            subprocess.run(npm_cmd, check=True)
+            _save_setup_state(node_deps=lock_hash)
             print("✅ Successfully installed Node.js dependencies")
             return True
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to install Node.js dependencies: {e}")
             return False
-    else:
-        print("⚠️  Skipping Node.js dependencies")
-        return False
+
+    return _do_install if deferred else _do_install()
 
 def update_env_file():
     """Update .env.local with backend URL"""
@@ -216,9 +324,22 @@ Configuration to be written to .env.local:
     print(config_info)
     
     if ask_yes_no("Do you want to create/update the configuration file?"):
-        env_content = "PYTHON_BACKEND_URL=http://localhost:8000\nTTS_ENGINE=chatterbox\n"
-        env_file.write_text(env_content)
-        
+        # Merge into whatever is already there instead of clobbering the
+        # file, so user-added keys survive a re-run of setup
+        env = {}
+        if env_file.exists():
+            for line in env_file.read_text().splitlines():
+                if "=" in line and not line.lstrip().startswith("#"):
+                    key, value = line.split("=", 1)
+                    env[key.strip()] = value
+        env["PYTHON_BACKEND_URL"] = "http://localhost:8000"
+        env["TTS_ENGINE"] = "chatterbox"
+        # Write to a sibling temp file and rename into place: os.replace is
+        # atomic, so a killed run can never leave a half-written config
+        tmp_file = env_file.with_name(env_file.name + ".tmp")
+        tmp_file.write_text("".join(f"{key}={value}\n" for key, value in env.items()))
+        os.replace(tmp_file, env_file)
+
         print("✅ Configuration updated")
         return True
     else:
@@ -227,14 +348,34 @@ Configuration to be written to .env.local:
 
 def main():
     """Main setup function with step-by-step confirmation"""
+    global ASSUME_DEFAULTS, FORCE_RERUN
+
+    parser = argparse.ArgumentParser(description="Audiobook Studio interactive setup")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="assume the default answer for every prompt (unattended mode)")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="re-run every step even if a previous run completed it")
+    args = parser.parse_args()
+    ASSUME_DEFAULTS = args.yes
+    FORCE_RERUN = args.force
+
     # Change to script directory
     os.chdir(Path(__file__).parent)
-    
+
     print("🚀 AUDIOBOOK STUDIO SETUP")
     print("=" * 50)
     print("This interactive setup will guide you through configuring your audiobook studio.")
     print("You can choose what to install and configure at each step.\n")
-    
+
+    probe = _probe_environment()
+    if probe.free_gb < 10:
+        print(f"⚠️  Only {probe.free_gb:.1f}GB of disk space free - the Python")
+        print("   dependencies and the Chatterbox model need roughly 10GB.")
+    if not probe.online:
+        print("⚠️  Could not reach pypi.org - dependency installs will likely fail.")
+        if not ask_yes_no("Continue anyway?", default="n"):
+            return
+
     # Step 1: Configuration
     print("STEP 1/5: Configuration")
     config_updated = update_env_file()
@@ -243,18 +384,34 @@ def main():
     print("\nSTEP 2/5: Python Virtual Environment")
     venv_created = create_virtual_environment()
     
-    # Step 3: Python dependencies
+    # Steps 3+4: confirm both dependency installs first, then let pip and
+    # npm run concurrently - their downloads hide behind each other, so the
+    # wall time is max(pip, npm) instead of the sum
     print("\nSTEP 3/5: Python Dependencies")
-    python_deps = install_dependencies() if venv_created else False
-    
-    # Step 4: Chatterbox TTS setup
-    print("\nSTEP 4/5: Chatterbox TTS Setup")
+    python_job = install_dependencies(deferred=True) if venv_created else False
+
+    print("\nSTEP 4/5: Node.js Dependencies")
+    node_job = install_node_dependencies(deferred=True)
+
+    python_deps, node_deps = python_job, node_job
+    if callable(python_job) and callable(node_job):
+        print("\n⏳ Installing Python and Node.js dependencies in parallel...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            python_future = executor.submit(python_job)
+            node_future = executor.submit(node_job)
+            python_deps = python_future.result()
+            node_deps = node_future.result()
+    else:
+        if callable(python_job):
+            python_deps = python_job()
+        if callable(node_job):
+            node_deps = node_job()
+
+    # Step 5: Chatterbox TTS setup - installs into the same venv pip just
+    # populated, so it runs after the parallel installs finish
+    print("\nSTEP 5/5: Chatterbox TTS Setup")
     chatterbox_setup = setup_chatterbox_tts()
     
-    # Step 5: Node.js dependencies
-    print("\nSTEP 5/5: Node.js Dependencies")
-    node_deps = install_node_dependencies()
-    
     # Summary
     print("\n🎉 SETUP SUMMARY")
     print("=" * 30)